@@ -3,82 +3,47 @@
 Generate ns-3 C++ code from GraphML topology description.
 """
 
-import xml.etree.ElementTree as ET
 import argparse
+import functools
+import re
 import sys
 from pathlib import Path
 
-
-def parse_graphml(graphml_file):
-    """Parse GraphML file and extract network topology."""
-    tree = ET.parse(graphml_file)
-    root = tree.getroot()
-
-    # GraphML namespace
-    ns = {"graphml": "http://graphml.graphdrawing.org/xmlns"}
-
-    # Parse key definitions
-    keys = {}
-    for key in root.findall(".//graphml:key", ns):
-        keys[key.get("id")] = {
-            "for": key.get("for"),
-            "name": key.get("attr.name"),
-            "type": key.get("attr.type"),
-        }
-
-    # Parse nodes
-    nodes = {}
-    for node in root.findall(".//graphml:node", ns):
-        node_id = node.get("id")
-        nodes[node_id] = {"id": node_id}
-
-        for data in node.findall("graphml:data", ns):
-            key_id = data.get("key")
-            if key_id in keys:
-                attr_name = keys[key_id]["name"]
-                nodes[node_id][attr_name] = data.text
-
-    # Parse edges
-    edges = []
-    for edge in root.findall(".//graphml:edge", ns):
-        edge_data = {
-            "id": edge.get("id"),
-            "source": edge.get("source"),
-            "target": edge.get("target"),
-        }
-
-        for data in edge.findall("graphml:data", ns):
-            key_id = data.get("key")
-            if key_id in keys:
-                attr_name = keys[key_id]["name"]
-                edge_data[attr_name] = data.text
-
-        edges.append(edge_data)
-
-    return nodes, edges
+from graphml_io import (
+    find_graphml_files,
+    open_output,
+    parse_graphml,
+    run_batch,
+    run_stdin_batch,
+)
+
+
+# Delay value with an optional unit suffix, e.g. "1ms", "2.5us", ".5 ms", "1e-3s", "3"
+_DELAY_RE = re.compile(
+    r"^(?P<val>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)\s*(?P<unit>ms|us|s)?$"
+)
+
+# ns-3 time unit per delay suffix; milliseconds if no unit specified
+_UNIT_MAP = {
+    "ms": "MilliSeconds",
+    "us": "MicroSeconds",
+    "s": "Seconds",
+    None: "MilliSeconds",
+}
 
 
+@functools.lru_cache(maxsize=None)
 def convert_delay_to_ns3(delay_str):
     """Convert delay string to ns-3 TimeValue format."""
-    if delay_str.endswith("ms"):
-        return f"TimeValue(MilliSeconds({delay_str[:-2]}))"
-    elif delay_str.endswith("us"):
-        return f"TimeValue(MicroSeconds({delay_str[:-2]}))"
-    elif delay_str.endswith("s"):
-        return f"TimeValue(Seconds({delay_str[:-1]}))"
-    else:
-        # Default to milliseconds if no unit specified
-        return f"TimeValue(MilliSeconds({delay_str}))"
-
+    match = _DELAY_RE.match(delay_str.strip())
+    if not match:
+        raise ValueError(f"Invalid delay '{delay_str}'")
 
-def generate_ns3_code(nodes, edges, output_file):
-    """Generate ns-3 C++ code from parsed topology."""
+    return f"TimeValue({_UNIT_MAP[match['unit']]}({match['val']}))"
 
-    # Sort nodes by their numeric id for consistent ordering
-    sorted_nodes = sorted(nodes.items(), key=lambda x: int(x[1].get("id", 0)))
-    node_count = len(sorted_nodes)
 
-    cpp_code = f"""#include "ns3/core-module.h"
+# C++ program skeleton, filled in by generate_ns3_code
+_HEADER_TEMPLATE = """#include "ns3/core-module.h"
 #include "ns3/csma-module.h"
 #include "ns3/network-module.h"
 #include "ns3/tap-bridge-module.h"
@@ -101,71 +66,76 @@ int main(int argc, char* argv[])
 
     // Create {node_count} ghost nodes
     NodeContainer n;
-    n.Create({node_count}); // {', '.join([node[1].get('name', f'node{i}') for i, node in enumerate(sorted_nodes)])}
+    n.Create({node_count}); // {node_names}
 
 """
 
-    # Generate CSMA links for each edge
-    for i, edge in enumerate(edges):
-        # Find node indices
-        source_idx = next(
-            (
-                idx
-                for idx, (node_id, node_data) in enumerate(sorted_nodes)
-                if node_id == edge["source"]
-            ),
-            0,
-        )
-        target_idx = next(
-            (
-                idx
-                for idx, (node_id, node_data) in enumerate(sorted_nodes)
-                if node_id == edge["target"]
-            ),
-            0,
-        )
-
-        datarate = edge.get("datarate", "100Mbps")
-        delay = edge.get("delay", "1ms")
-        network = edge.get("network", f"10.0.{i+1}.*")
-
-        cpp_code += f"""    // --- LAN {network} ({edge['source']} <-> {edge['target']}) ---
-    CsmaHelper csma{i+1};
-    csma{i+1}.SetChannelAttribute("DataRate", StringValue("{datarate}"));
-    csma{i+1}.SetChannelAttribute("Delay", {convert_delay_to_ns3(delay)});
-    NetDeviceContainer d{i+1} = csma{i+1}.Install(NodeContainer(n.Get({source_idx}), n.Get({target_idx})));
+_LINK_TEMPLATE = """    // --- LAN {network} ({source} <-> {target}) ---
+    CsmaHelper csma{link};
+    csma{link}.SetChannelAttribute("DataRate", StringValue("{datarate}"));
+    csma{link}.SetChannelAttribute("Delay", {delay});
+    NetDeviceContainer d{link} = csma{link}.Install(NodeContainer(n.Get({source_idx}), n.Get({target_idx})));
 
 """
 
-    # Generate TapBridge configuration
-    cpp_code += """    // Setup TapBridge
+_TAP_TEMPLATE = '    tb.SetAttribute("DeviceName", StringValue("{tap}")); tb.Install(n.Get({node_idx}), d{link}.Get({port}));\n'
+
+_TAP_BRIDGE_HEADER = """    // Setup TapBridge
     TapBridgeHelper tb;
     tb.SetAttribute("Mode", StringValue("UseBridge"));
 
 """
 
-    # Group tap devices by node for cleaner output
+_FOOTER = """
+    // Run simulation for 10 minutes
+    Simulator::Stop(Seconds(600.0));
+    Simulator::Run();
+    Simulator::Destroy();
+
+    return 0;
+}
+"""
+
+
+def generate_ns3_code(nodes, edges, out):
+    """Generate ns-3 C++ code from parsed topology, writing it to out."""
+
+    # Sort node ids by their numeric id for consistent ordering
+    sorted_ids = sorted(nodes, key=lambda node_id: int(nodes[node_id].id))
+
+    out.write(_HEADER_TEMPLATE.format(
+        node_count=len(sorted_ids),
+        node_names=", ".join(
+            nodes[node_id].name or f"node{i}" for i, node_id in enumerate(sorted_ids)
+        ),
+    ))
+
+    # Map node id -> index into n for O(1) lookups per edge
+    id_to_idx = {node_id: idx for idx, node_id in enumerate(sorted_ids)}
+
+    # Generate CSMA links for each edge, grouping tap devices by node for
+    # cleaner output of the TapBridge section below
     node_taps = {}
     for i, edge in enumerate(edges):
-        source_idx = next(
-            (
-                idx
-                for idx, (node_id, node_data) in enumerate(sorted_nodes)
-                if node_id == edge["source"]
-            ),
-            0,
-        )
-        target_idx = next(
-            (
-                idx
-                for idx, (node_id, node_data) in enumerate(sorted_nodes)
-                if node_id == edge["target"]
-            ),
-            0,
-        )
-
-        tap_a = edge.get("tap_device_a", f"tap_{source_idx}_{i}")
-        tap_b = edge.get("tap_device_b", f"tap_{target_idx}_{i}")
+        for endpoint in (edge.source, edge.target):
+            if endpoint not in id_to_idx:
+                raise ValueError(f"Edge {edge.id} references unknown node '{endpoint}'")
+        source_idx = id_to_idx[edge.source]
+        target_idx = id_to_idx[edge.target]
+
+        out.write(_LINK_TEMPLATE.format(
+            link=i + 1,
+            network=edge.network or f"10.0.{i+1}.*",
+            source=edge.source,
+            target=edge.target,
+            datarate=edge.datarate or "100Mbps",
+            delay=convert_delay_to_ns3(edge.delay or "1ms"),
+            source_idx=source_idx,
+            target_idx=target_idx,
+        ))
+
+        tap_a = edge.tap_device_a or f"tap_{source_idx}_{i}"
+        tap_b = edge.tap_device_b or f"tap_{target_idx}_{i}"
 
         if source_idx not in node_taps:
             node_taps[source_idx] = []
@@ -173,56 +143,94 @@ int main(int argc, char* argv[])
             node_taps[target_idx] = []
 
         node_taps[source_idx].append(
-            f'tb.SetAttribute("DeviceName", StringValue("{tap_a}")); tb.Install(n.Get({source_idx}), d{i+1}.Get(0));'
+            _TAP_TEMPLATE.format(tap=tap_a, node_idx=source_idx, link=i + 1, port=0)
         )
         node_taps[target_idx].append(
-            f'tb.SetAttribute("DeviceName", StringValue("{tap_b}")); tb.Install(n.Get({target_idx}), d{i+1}.Get(1));'
+            _TAP_TEMPLATE.format(tap=tap_b, node_idx=target_idx, link=i + 1, port=1)
         )
 
+    # Generate TapBridge configuration
+    out.write(_TAP_BRIDGE_HEADER)
+
     # Output tap bridge configurations grouped by node
     for node_idx in sorted(node_taps.keys()):
-        node_name = sorted_nodes[node_idx][1].get("name", f"node{node_idx}")
-        cpp_code += f"    // {node_name}\n"
-        for tap_config in node_taps[node_idx]:
-            cpp_code += f"    {tap_config}\n"
+        node_name = nodes[sorted_ids[node_idx]].name or f"node{node_idx}"
+        out.write(f"    // {node_name}\n")
+        out.writelines(node_taps[node_idx])
 
-    cpp_code += """
-    // Run simulation for 10 minutes
-    Simulator::Stop(Seconds(600.0));
-    Simulator::Run();
-    Simulator::Destroy();
+    out.write(_FOOTER)
 
-    return 0;
-}
-"""
 
-    with open(output_file, "w") as f:
-        f.write(cpp_code)
+def default_output(graphml_file):
+    """Default output for a GraphML file: the .cc file next to it."""
+    return Path(graphml_file).with_suffix(".cc")
+
+
+def process_graphml(graphml_file, output_file=None):
+    """Generate ns-3 code for one GraphML file (default: next to the input)."""
+    if output_file is None:
+        output_file = default_output(graphml_file)
+
+    nodes, edges, _ = parse_graphml(graphml_file)
+    with open_output(output_file) as f:
+        generate_ns3_code(nodes, edges, f)
+    return output_file, len(nodes), len(edges)
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Generate ns-3 C++ code from GraphML topology"
     )
-    parser.add_argument("graphml_file", help="Input GraphML file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("graphml_file", nargs="?", help="Input GraphML file")
+    source.add_argument(
+        "--batch",
+        metavar="DIR",
+        help="Process every GraphML file under DIR in parallel, writing each "
+        "output next to its input",
+    )
+    source.add_argument(
+        "--stdin-batch",
+        action="store_true",
+        help="Read GraphML file paths from stdin, one per line, and process "
+        "them in this process, writing each output next to its input",
+    )
     parser.add_argument(
         "-o",
         "--output",
-        default="topology.cc",
         help="Output C++ file (default: topology.cc)",
     )
 
     args = parser.parse_args()
 
+    if (args.batch or args.stdin_batch) and args.output:
+        parser.error("-o/--output cannot be used with --batch or --stdin-batch")
+
+    if args.batch:
+        if not Path(args.batch).is_dir():
+            print(f"Error: directory '{args.batch}' not found", file=sys.stderr)
+            sys.exit(1)
+
+        if run_batch(process_graphml, find_graphml_files(args.batch), default_output):
+            sys.exit(1)
+        return
+
+    if args.stdin_batch:
+        if run_stdin_batch(process_graphml, default_output):
+            sys.exit(1)
+        return
+
     if not Path(args.graphml_file).exists():
         print(f"Error: GraphML file '{args.graphml_file}' not found", file=sys.stderr)
         sys.exit(1)
 
+    if not args.output:
+        args.output = "topology.cc"
+
     try:
-        nodes, edges = parse_graphml(args.graphml_file)
-        generate_ns3_code(nodes, edges, args.output)
+        _, node_count, link_count = process_graphml(args.graphml_file, args.output)
         print(f"Generated ns-3 code: {args.output}")
-        print(f"Nodes: {len(nodes)}, Links: {len(edges)}")
+        print(f"Nodes: {node_count}, Links: {link_count}")
     except Exception as e:
         print(f"Error generating code: {e}", file=sys.stderr)
         sys.exit(1)
@@ -3,104 +3,53 @@
 Generate Zenoh NETWORK_CONFIG.json5 from GraphML topology description.
 """
 
-import xml.etree.ElementTree as ET
 import argparse
 import sys
 import json
+import functools
 import hashlib
+import re
 from pathlib import Path
 
+from graphml_io import (
+    find_graphml_files,
+    open_output,
+    parse_graphml,
+    run_batch,
+    run_stdin_batch,
+)
 
-def parse_graphml(graphml_file):
-    """Parse GraphML file and extract network topology."""
-    tree = ET.parse(graphml_file)
-    root = tree.getroot()
+# Identifier-like object keys at the start of a line. Numeric keys such as
+# node ids are left quoted since JSON5 requires it.
+_JSON5_KEY_RE = re.compile(r'^(\s*)"([A-Za-z_]\w*)":', re.MULTILINE)
 
-    # GraphML namespace
-    ns = {"graphml": "http://graphml.graphdrawing.org/xmlns"}
-
-    # Parse key definitions
-    keys = {}
-    for key in root.findall(".//graphml:key", ns):
-        keys[key.get("id")] = {
-            "for": key.get("for"),
-            "name": key.get("attr.name"),
-            "type": key.get("attr.type"),
-        }
-
-    # Parse nodes
-    nodes = {}
-    for node in root.findall(".//graphml:node", ns):
-        node_id = node.get("id")
-        nodes[node_id] = {"id": node_id}
-
-        for data in node.findall("graphml:data", ns):
-            key_id = data.get("key")
-            if key_id in keys:
-                attr_name = keys[key_id]["name"]
-                nodes[node_id][attr_name] = data.text
-
-    # Parse edges
-    edges = []
-    for edge in root.findall(".//graphml:edge", ns):
-        edge_data = {
-            "id": edge.get("id"),
-            "source": edge.get("source"),
-            "target": edge.get("target"),
-        }
-
-        for data in edge.findall("graphml:data", ns):
-            key_id = data.get("key")
-            if key_id in keys:
-                attr_name = keys[key_id]["name"]
-                edge_data[attr_name] = data.text
-
-        edges.append(edge_data)
-
-    return nodes, edges
+# Salt hashed together with the node id to derive its ZID
+_ZID_PREFIX = b"zenoh_node_"
 
 
+@functools.lru_cache(maxsize=None)
 def generate_zid(node_id):
     """Generate consistent ZID for a node based on its ID."""
-    # Create a consistent hash from node_id
-    hash_obj = hashlib.md5(f"zenoh_node_{node_id}".encode())
-    return hash_obj.hexdigest()
+    # Create a consistent hash from node_id, truncated to the 16 bytes
+    # (32 hex digits) a Zenoh ID can hold
+    hash_obj = hashlib.sha256(_ZID_PREFIX + str(node_id).encode())
+    return hash_obj.hexdigest()[:32]
 
 
-def extract_listen_endpoints(node_id, edges, nodes):
-    """Extract listen endpoints for a node from edge data."""
+def extract_listen_endpoints(node_id, nodes, adj, base_ips):
+    """Extract listen endpoints for a node from its incident edges."""
     endpoints = []
-    node_numeric_id = nodes[node_id].get("id", "0")
-
-    for edge in edges:
-        if edge["source"] == node_id:
-            # This node is the source, use tap_device_a
-            tap_device = edge.get("tap_device_a", f"tap_{node_numeric_id}_0")
-            network = edge.get("network", "10.0.1.*")
+    node_numeric_id = int(nodes[node_id].id)
+    host = node_numeric_id + 1
+    port = 8000 + node_numeric_id
 
-            # Extract IP from network pattern (e.g., "10.0.1.*" -> "10.0.1")
-            base_ip = network.split("*")[0].rstrip(".")
-            ip_addr = f"{base_ip}.{int(node_numeric_id) + 1}"
-            port = 8000 + int(node_numeric_id)
-
-            endpoints.append(f"tcp/{ip_addr}:{port}")
-
-        elif edge["target"] == node_id:
-            # This node is the target, use tap_device_b
-            tap_device = edge.get("tap_device_b", f"tap_{node_numeric_id}_1")
-            network = edge.get("network", "10.0.1.*")
-
-            # Extract IP from network pattern
-            base_ip = network.split("*")[0].rstrip(".")
-            ip_addr = f"{base_ip}.{int(node_numeric_id) + 1}"
-            port = 8000 + int(node_numeric_id)
-
-            endpoints.append(f"tcp/{ip_addr}:{port}")
+    for edge_idx in adj[node_id]:
+        endpoints.append(f"tcp/{base_ips[edge_idx]}.{host}:{port}")
 
     return endpoints
 
 
-def generate_zenoh_config(nodes, edges, experiment_name, zenoh_binary_path):
+def generate_zenoh_config(nodes, edges, adj, experiment_name, zenoh_binary_path):
     """Generate Zenoh configuration from parsed GraphML."""
 
     config = {
@@ -114,12 +63,20 @@ def generate_zenoh_config(nodes, edges, experiment_name, zenoh_binary_path):
         "links": []
     }
 
-    # Generate node configurations
+    # Extract each link's base IP from its network pattern once
+    # (e.g., "10.0.1.*" -> "10.0.1")
+    base_ips = [
+        (edge.network or "10.0.1.*").split("*")[0].rstrip(".") for edge in edges
+    ]
+
+    # Generate node configurations, recording the position of each link
+    # within its endpoints' listen_endpoints lists
+    endpoint_idx = {}
     for node_id, node_data in nodes.items():
-        numeric_id = node_data.get("id", "0")
-        node_name = node_data.get("name", node_id)
+        numeric_id = node_data.id
 
-        listen_endpoints = extract_listen_endpoints(node_id, edges, nodes)
+        listen_endpoints = extract_listen_endpoints(node_id, nodes, adj, base_ips)
+        endpoint_idx[node_id] = {edge_idx: i for i, edge_idx in enumerate(adj[node_id])}
 
         config["nodes"][numeric_id] = {
             "zid": {
@@ -131,85 +88,68 @@ def generate_zenoh_config(nodes, edges, experiment_name, zenoh_binary_path):
         }
 
     # Generate link configurations
-    for edge in edges:
-        source_id = nodes[edge["source"]].get("id", "0")
-        target_id = nodes[edge["target"]].get("id", "0")
-
-        # Find endpoint indices for the link
-        source_endpoints = extract_listen_endpoints(edge["source"], edges, nodes)
-        target_endpoints = extract_listen_endpoints(edge["target"], edges, nodes)
+    for i, edge in enumerate(edges):
+        source_id = nodes[edge.source].id
+        target_id = nodes[edge.target].id
 
         config["links"].append({
             "a": source_id,
-            "a_idx": 0,  # Simplified - could be enhanced to track actual indices
+            "a_idx": endpoint_idx[edge.source][i],
             "b": target_id,
-            "b_idx": 0
+            "b_idx": endpoint_idx[edge.target][i]
         })
 
     return config
 
 
-def write_json5_config(config, output_file):
-    """Write configuration as JSON5 format."""
+def write_json5_config(config, out):
+    """Write configuration as JSON5 format to out."""
 
-    # Convert to JSON string first
-    json_str = json.dumps(config, indent=4)
+    # JSON is a subset of JSON5, so serialize once and unquote keys
+    json5_content = _JSON5_KEY_RE.sub(r"\1\2:", json.dumps(config, indent=4))
 
-    # Convert to JSON5-like format with comments
-    json5_content = f"""{{
-    experiment: "{config['experiment']}",
+    out.write(json5_content)
+    out.write("\n")
 
-    docker_image: {{
-        tag: "{config['docker_image']['tag']}",
-        clean_first: {str(config['docker_image']['clean_first']).lower()}
-    }},
 
-    volume: "{config['volume']}",
+def default_name(graphml_file):
+    """Default experiment name for a GraphML file: its directory name."""
+    return Path(graphml_file).parent.name
 
-    nodes: {{"""
 
-    # Add nodes
-    for node_id, node_config in config["nodes"].items():
-        endpoints_str = ",\n            ".join([f'"{ep}"' for ep in node_config["listen_endpoints"]])
+def default_output(graphml_file):
+    """Default output for a GraphML file: NETWORK_CONFIG.json5 in its directory."""
+    return Path(graphml_file).parent / "NETWORK_CONFIG.json5"
 
-        json5_content += f"""
-        "{node_id}": {{
-            zid: {{set: true, value: "{node_config['zid']['value']}"}},
-            listen_endpoints: [
-                {endpoints_str}
-            ],
-            role: "{node_config['role']}"
-        }},"""
 
-    # Remove trailing comma
-    json5_content = json5_content.rstrip(",")
+def process_graphml(graphml_file, zenoh_path, output_file=None, name=None):
+    """Generate the Zenoh config for one GraphML file.
 
-    json5_content += """
-    },
+    The experiment name and output file default to default_name() and
+    default_output().
+    """
+    if not name:
+        name = default_name(graphml_file)
+    if not output_file:
+        output_file = default_output(graphml_file)
 
-    links: ["""
-
-    # Add links
-    for link in config["links"]:
-        json5_content += f"""
-        {{ a: "{link['a']}", a_idx: {link['a_idx']}, b: "{link['b']}", b_idx: {link['b_idx']} }},"""
-
-    # Remove trailing comma and close
-    json5_content = json5_content.rstrip(",")
-    json5_content += """
-    ]
-}
-"""
-
-    with open(output_file, "w") as f:
-        f.write(json5_content)
+    nodes, edges, adj = parse_graphml(graphml_file)
+    config = generate_zenoh_config(nodes, edges, adj, name, zenoh_path)
+    with open_output(output_file) as f:
+        write_json5_config(config, f)
+    return output_file, len(nodes), len(edges)
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Generate Zenoh NETWORK_CONFIG.json5 from GraphML topology"
     )
-    parser.add_argument("graphml_file", help="Input GraphML file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("graphml_file", nargs="?", help="Input GraphML file")
+    source.add_argument("--batch", metavar="DIR",
+                       help="Process every GraphML file under DIR in parallel, using the default name and output for each")
+    source.add_argument("--stdin-batch", action="store_true",
+                       help="Read GraphML file paths from stdin, one per line, and process them in this process, using the default name and output for each")
     parser.add_argument("-o", "--output", help="Output JSON5 file")
     parser.add_argument("-n", "--name", help="Experiment name (default: derived from GraphML filename)")
     parser.add_argument("-z", "--zenoh-path",
@@ -218,31 +158,40 @@ def main():
 
     args = parser.parse_args()
 
-    if not Path(args.graphml_file).exists():
-        print(f"Error: GraphML file '{args.graphml_file}' not found", file=sys.stderr)
-        sys.exit(1)
+    if (args.batch or args.stdin_batch) and (args.output or args.name):
+        parser.error("-o/--output and -n/--name cannot be used with --batch or --stdin-batch")
 
-    # Set defaults
-    if not args.name:
-        args.name = Path(args.graphml_file).parent.name
+    process = functools.partial(process_graphml, zenoh_path=args.zenoh_path)
 
-    if not args.output:
-        output_dir = Path(args.graphml_file).parent
-        args.output = output_dir / "NETWORK_CONFIG.json5"
+    if args.batch:
+        if not Path(args.batch).is_dir():
+            print(f"Error: directory '{args.batch}' not found", file=sys.stderr)
+            sys.exit(1)
 
-    try:
-        print(f"Parsing GraphML file: {args.graphml_file}")
-        nodes, edges = parse_graphml(args.graphml_file)
+        if run_batch(process, find_graphml_files(args.batch), default_output):
+            sys.exit(1)
+        return
 
-        print(f"Generating Zenoh configuration for experiment: {args.name}")
-        config = generate_zenoh_config(nodes, edges, args.name, args.zenoh_path)
+    if args.stdin_batch:
+        if run_stdin_batch(process, default_output):
+            sys.exit(1)
+        return
 
-        print(f"Writing configuration to: {args.output}")
-        write_json5_config(config, args.output)
+    if not Path(args.graphml_file).exists():
+        print(f"Error: GraphML file '{args.graphml_file}' not found", file=sys.stderr)
+        sys.exit(1)
+
+    name = args.name or default_name(args.graphml_file)
 
-        print(f"✓ Successfully generated Zenoh config: {args.output}")
-        print(f"  Experiment: {args.name}")
-        print(f"  Nodes: {len(nodes)}, Links: {len(edges)}")
+    try:
+        print(f"Generating Zenoh configuration for experiment: {name}")
+        output_file, node_count, link_count = process(
+            args.graphml_file, output_file=args.output, name=name
+        )
+
+        print(f"✓ Successfully generated Zenoh config: {output_file}")
+        print(f"  Experiment: {name}")
+        print(f"  Nodes: {node_count}, Links: {link_count}")
 
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -3,67 +3,20 @@
 Convert GraphML to PNG image using Graphviz.
 """
 
-import xml.etree.ElementTree as ET
 import argparse
+import functools
+import io
 import sys
 import subprocess
-import tempfile
 from pathlib import Path
 
+from graphml_io import find_graphml_files, parse_graphml, run_batch, run_stdin_batch
 
-def parse_graphml(graphml_file):
-    """Parse GraphML file and extract network topology."""
-    tree = ET.parse(graphml_file)
-    root = tree.getroot()
 
-    # GraphML namespace
-    ns = {"graphml": "http://graphml.graphdrawing.org/xmlns"}
+def generate_dot(nodes, edges, out, layout="neato", dpi=150):
+    """Generate DOT format from parsed GraphML, writing it to out."""
 
-    # Parse key definitions
-    keys = {}
-    for key in root.findall(".//graphml:key", ns):
-        keys[key.get("id")] = {
-            "for": key.get("for"),
-            "name": key.get("attr.name"),
-            "type": key.get("attr.type"),
-        }
-
-    # Parse nodes
-    nodes = {}
-    for node in root.findall(".//graphml:node", ns):
-        node_id = node.get("id")
-        nodes[node_id] = {"id": node_id}
-
-        for data in node.findall("graphml:data", ns):
-            key_id = data.get("key")
-            if key_id in keys:
-                attr_name = keys[key_id]["name"]
-                nodes[node_id][attr_name] = data.text
-
-    # Parse edges
-    edges = []
-    for edge in root.findall(".//graphml:edge", ns):
-        edge_data = {
-            "id": edge.get("id"),
-            "source": edge.get("source"),
-            "target": edge.get("target"),
-        }
-
-        for data in edge.findall("graphml:data", ns):
-            key_id = data.get("key")
-            if key_id in keys:
-                attr_name = keys[key_id]["name"]
-                edge_data[attr_name] = data.text
-
-        edges.append(edge_data)
-
-    return nodes, edges
-
-
-def generate_dot(nodes, edges, layout="neato", dpi=150):
-    """Generate DOT format from parsed GraphML."""
-
-    dot_content = f"""graph network_topology {{
+    out.write(f"""graph network_topology {{
     // Graph attributes
     layout={layout};
     dpi={dpi};
@@ -83,79 +36,77 @@ def generate_dot(nodes, edges, layout="neato", dpi=150):
           labelangle=0, labelfloat=true];
 
     // Nodes
-"""
+""")
 
     # Add nodes
     for node_id, node_data in nodes.items():
-        name = node_data.get("name", node_id)
-        dot_content += f'    {node_id} [label="{name}"];\n'
+        name = node_data.name or node_id
+        out.write(f'    {node_id} [label="{name}"];\n')
 
-    dot_content += "\n    // Edges\n"
+    out.write("\n    // Edges\n")
 
     # Add edges with labels
     for edge in edges:
-        source = edge["source"]
-        target = edge["target"]
+        source = edge.source
+        target = edge.target
 
         # Build edge label from attributes
         labels = []
-        if "datarate" in edge:
-            labels.append(f"Rate: {edge['datarate']}")
-        if "delay" in edge:
-            labels.append(f"Delay: {edge['delay']}")
-        if "network" in edge:
-            labels.append(f"Net: {edge['network']}")
+        if edge.datarate is not None:
+            labels.append(f"Rate: {edge.datarate}")
+        if edge.delay is not None:
+            labels.append(f"Delay: {edge.delay}")
+        if edge.network is not None:
+            labels.append(f"Net: {edge.network}")
 
         label = "\\n".join(labels) if labels else ""
 
         if label:
-            dot_content += f'    {source} -- {target} [label="{label}"];\n'
+            out.write(f'    {source} -- {target} [label="{label}"];\n')
         else:
-            dot_content += f'    {source} -- {target};\n'
+            out.write(f'    {source} -- {target};\n')
 
-    dot_content += "}\n"
-
-    return dot_content
-
-
-def check_graphviz():
-    """Check if Graphviz is installed."""
-    try:
-        subprocess.run(["dot", "-V"], capture_output=True, check=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+    out.write("}\n")
 
 
 def generate_png(dot_content, output_file, layout="neato", format="png", dpi=150):
     """Generate image from DOT content using Graphviz."""
 
-    if not check_graphviz():
-        print("Error: Graphviz not found. Install with: sudo apt-get install graphviz", file=sys.stderr)
-        sys.exit(1)
+    # Feed the DOT content to Graphviz on stdin, with DPI setting
+    cmd = [layout, f"-T{format}", f"-Gdpi={dpi}", "-o", output_file]
+    try:
+        subprocess.run(cmd, input=dot_content, capture_output=True, text=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError("Graphviz not found. Install with: sudo apt-get install graphviz") from None
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Graphviz {layout} failed: {e.stderr.strip()}") from None
 
-    # Use temporary file for DOT content
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.dot', delete=False) as temp_dot:
-        temp_dot.write(dot_content)
-        temp_dot_path = temp_dot.name
 
-    try:
-        # Run Graphviz to generate image with DPI setting
-        cmd = [layout, f"-T{format}", f"-Gdpi={dpi}", temp_dot_path, "-o", output_file]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+def default_output(graphml_file, format="png"):
+    """Default output for a GraphML file: the image next to it."""
+    return str(Path(graphml_file).with_suffix(f".{format}"))
 
-        if result.returncode != 0:
-            print(f"Error running Graphviz: {result.stderr}", file=sys.stderr)
-            sys.exit(1)
 
-    finally:
-        # Clean up temporary file
-        Path(temp_dot_path).unlink()
+def process_graphml(graphml_file, output_file=None, layout="neato", format="png", dpi=150):
+    """Render one GraphML file to an image (default: next to the input)."""
+    if not output_file:
+        output_file = default_output(graphml_file, format)
+
+    nodes, edges, _ = parse_graphml(graphml_file)
+    dot = io.StringIO()
+    generate_dot(nodes, edges, dot, layout, dpi)
+    generate_png(dot.getvalue(), output_file, layout, format, dpi)
+    return output_file, len(nodes), len(edges)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Convert GraphML to PNG image using Graphviz")
-    parser.add_argument("graphml_file", help="Input GraphML file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("graphml_file", nargs="?", help="Input GraphML file")
+    source.add_argument("--batch", metavar="DIR",
+                       help="Process every GraphML file under DIR in parallel, writing each image next to its input")
+    source.add_argument("--stdin-batch", action="store_true",
+                       help="Read GraphML file paths from stdin, one per line, and process them in this process, writing each image next to its input")
     parser.add_argument("-o", "--output", help="Output image file (default: topology.png)")
     parser.add_argument("-l", "--layout", default="neato",
                        choices=["dot", "neato", "circo", "fdp", "sfdp", "twopi"],
@@ -168,6 +119,28 @@ def main():
 
     args = parser.parse_args()
 
+    if (args.batch or args.stdin_batch) and args.output:
+        parser.error("-o/--output cannot be used with --batch or --stdin-batch")
+
+    process = functools.partial(
+        process_graphml, layout=args.layout, format=args.format, dpi=args.dpi
+    )
+    output_for = functools.partial(default_output, format=args.format)
+
+    if args.batch:
+        if not Path(args.batch).is_dir():
+            print(f"Error: directory '{args.batch}' not found", file=sys.stderr)
+            sys.exit(1)
+
+        if run_batch(process, find_graphml_files(args.batch), output_for):
+            sys.exit(1)
+        return
+
+    if args.stdin_batch:
+        if run_stdin_batch(process, output_for):
+            sys.exit(1)
+        return
+
     # Set default output filename based on input and format
     if not args.output:
         input_stem = Path(args.graphml_file).stem
@@ -179,16 +152,11 @@ def main():
 
     try:
         print(f"Parsing GraphML file: {args.graphml_file}")
-        nodes, edges = parse_graphml(args.graphml_file)
-
-        print(f"Generating DOT content (layout: {args.layout}, dpi: {args.dpi})")
-        dot_content = generate_dot(nodes, edges, args.layout, args.dpi)
-
-        print(f"Creating {args.format.upper()} image: {args.output}")
-        generate_png(dot_content, args.output, args.layout, args.format, args.dpi)
+        print(f"Creating {args.format.upper()} image (layout: {args.layout}, dpi: {args.dpi}): {args.output}")
+        _, node_count, link_count = process(args.graphml_file, args.output)
 
         print(f"✓ Successfully generated: {args.output}")
-        print(f"  Nodes: {len(nodes)}, Links: {len(edges)}")
+        print(f"  Nodes: {node_count}, Links: {link_count}")
 
         # Show file size
         file_size = Path(args.output).stat().st_size
@@ -0,0 +1,251 @@
+"""
+Shared GraphML topology parsing and batch processing for the generator scripts.
+"""
+
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+
+# GraphML namespace
+GRAPHML_NS_URI = "http://graphml.graphdrawing.org/xmlns"
+GRAPHML_NS = {"graphml": GRAPHML_NS_URI}
+
+# Namespace-qualified ({uri}tag) names, matched without prefix resolution
+_KEY_TAG = f"{{{GRAPHML_NS_URI}}}key"
+_NODE_TAG = f"{{{GRAPHML_NS_URI}}}node"
+_EDGE_TAG = f"{{{GRAPHML_NS_URI}}}edge"
+_DATA_TAG = f"{{{GRAPHML_NS_URI}}}data"
+_ELEMENT_TAGS = frozenset((_KEY_TAG, _NODE_TAG, _EDGE_TAG))
+
+# Parsed topology records. Fields are named after the GraphML attribute
+# names (attr.name) they are read from; attributes absent from the file are
+# None and other attributes are ignored. A node's id is its numeric id
+# attribute, falling back to the GraphML node id.
+Node = namedtuple("Node", ["id", "name"], defaults=[None])
+Edge = namedtuple(
+    "Edge",
+    ["id", "source", "target", "datarate", "delay", "network",
+     "tap_device_a", "tap_device_b"],
+    defaults=[None] * 5,
+)
+
+if hasattr(ET, "XPath"):
+    # lxml: compile the lookup once instead of re-parsing it on every call
+    _find_data = ET.XPath("graphml:data", namespaces=GRAPHML_NS)
+
+    def _iter_elements(graphml_file):
+        """Yield key, node and edge elements as they are parsed, then free them."""
+        for _, elem in ET.iterparse(
+            graphml_file, events=("end",), tag=tuple(_ELEMENT_TAGS)
+        ):
+            yield elem
+            # Drop the element and any already-processed siblings so the
+            # document is never held in memory as a whole
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+else:
+    def _find_data(elem):
+        return elem.findall(_DATA_TAG)
+
+    def _iter_elements(graphml_file):
+        """Yield key, node and edge elements as they are parsed, then free them."""
+        for _, elem in ET.iterparse(graphml_file, events=("end",)):
+            if elem.tag in _ELEMENT_TAGS:
+                yield elem
+                elem.clear()
+
+
+def parse_graphml(graphml_file):
+    """Parse GraphML file and extract network topology.
+
+    The file is streamed rather than loaded as a full DOM. Returns
+    ``(nodes, edges, adj)``: ``nodes`` maps GraphML node ids to ``Node``
+    records, ``edges`` is a list of ``Edge`` records, and ``adj`` maps each
+    node id to the indices in ``edges`` of the links it participates in, in
+    edge order.
+    """
+    keys = {}
+    nodes = {}
+    edges = []
+
+    for elem in _iter_elements(graphml_file):
+        # Key definitions precede the graph in a valid GraphML file
+        if elem.tag == _KEY_TAG:
+            keys[elem.get("id")] = {
+                "for": elem.get("for"),
+                "name": elem.get("attr.name"),
+                "type": elem.get("attr.type"),
+            }
+            continue
+
+        if elem.tag == _NODE_TAG:
+            record = Node
+            attrs = {"id": elem.get("id")}
+        else:
+            record = Edge
+            attrs = {
+                "id": elem.get("id"),
+                "source": elem.get("source"),
+                "target": elem.get("target"),
+            }
+
+        for data in _find_data(elem):
+            key_id = data.get("key")
+            if key_id in keys:
+                attr_name = keys[key_id]["name"]
+                if attr_name in record._fields:
+                    attrs[attr_name] = data.text
+
+        if record is Node:
+            nodes[elem.get("id")] = Node(**attrs)
+        else:
+            edges.append(Edge(**attrs))
+
+    # Build node -> incident edge indices in a single pass over the edges
+    adj = {node_id: [] for node_id in nodes}
+    for i, edge in enumerate(edges):
+        adj.setdefault(edge.source, []).append(i)
+        if edge.target != edge.source:
+            adj.setdefault(edge.target, []).append(i)
+
+    return nodes, edges, adj
+
+
+@contextmanager
+def open_output(output_file):
+    """Open a generated file for chunked writes, replacing it only on success.
+
+    Writes go to a temporary file in the same directory, which is moved
+    over output_file once the block completes. If generation fails partway,
+    the temporary file is removed and any previous output is left intact.
+    UTF-8 without newline translation, with a 1 MiB buffer so the many
+    small writes of a large topology become few system calls.
+    """
+    output_file = Path(output_file)
+    tmp_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+            yield f
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+def find_graphml_files(directory):
+    """Find all GraphML files under a directory, in sorted order."""
+    return sorted(Path(directory).rglob("*.graphml"))
+
+
+def _run_batch_item(process_graphml, graphml_file):
+    """Run one batch item, returning ``(result, error message)``.
+
+    Errors are returned as text since some parser exceptions (e.g. lxml's
+    XMLSyntaxError) cannot be pickled back to the parent process.
+    """
+    try:
+        return process_graphml(graphml_file), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _report_batch_item(graphml_file, result, error):
+    """Print the outcome of one batch item; returns True on success."""
+    if error is not None:
+        print(f"✗ {graphml_file}: {error}", file=sys.stderr, flush=True)
+        return False
+
+    output_file, node_count, link_count = result
+    print(f"✓ {output_file} (Nodes: {node_count}, Links: {link_count})", flush=True)
+    return True
+
+
+def _find_output_conflicts(graphml_files, output_for):
+    """Map each output file claimed by more than one input to those inputs."""
+    claims = {}
+    for path in graphml_files:
+        claims.setdefault(Path(output_for(path)).resolve(), []).append(path)
+    return {output: paths for output, paths in claims.items() if len(paths) > 1}
+
+
+def run_batch(process_graphml, graphml_files, output_for):
+    """Process independent GraphML files in parallel, one worker per CPU.
+
+    ``process_graphml`` must be a picklable top-level callable taking a
+    GraphML path and returning ``(output_file, node_count, link_count)``.
+    ``output_for`` maps a GraphML path to the output file it will write.
+    Nothing is processed if two inputs would write the same output, since
+    parallel workers would overwrite each other. Returns the number of
+    files that failed.
+    """
+    conflicts = _find_output_conflicts(graphml_files, output_for)
+    if conflicts:
+        for output_file, paths in conflicts.items():
+            inputs = ", ".join(str(path) for path in paths)
+            print(f"✗ {output_file}: would be written by each of {inputs}", file=sys.stderr)
+        print("No GraphML files processed", file=sys.stderr)
+        return sum(len(paths) for paths in conflicts.values())
+
+    error_count = 0
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [
+            executor.submit(_run_batch_item, process_graphml, path)
+            for path in graphml_files
+        ]
+
+        # Report in input order regardless of completion order
+        for path, future in zip(graphml_files, futures):
+            if not _report_batch_item(path, *future.result()):
+                error_count += 1
+
+    print(f"Processed {len(graphml_files) - error_count}/{len(graphml_files)} GraphML files")
+    return error_count
+
+
+def run_stdin_batch(process_graphml, output_for):
+    """Process GraphML paths read from stdin, one per line, in this process.
+
+    Keeps a single interpreter alive across many files so startup and
+    import cost is paid once, e.g. when regenerating topology variants
+    during a parameter sweep. Each result is printed as soon as the file
+    is done. The same path may be sent again to regenerate it, but a path
+    whose output (per ``output_for``) was already written for a different
+    input earlier in the run is reported as failed rather than overwriting it.
+    Returns the number of files that failed.
+    """
+    processed_count = 0
+    error_count = 0
+    written = {}
+
+    for line in sys.stdin:
+        path = line.strip()
+        if not path:
+            continue
+        processed_count += 1
+
+        output_file = Path(output_for(path)).resolve()
+        if written.get(output_file, path) != path:
+            error = f"{output_file} was already written for {written[output_file]}"
+            _report_batch_item(path, None, error)
+            error_count += 1
+            continue
+
+        if _report_batch_item(path, *_run_batch_item(process_graphml, path)):
+            written[output_file] = path
+        else:
+            error_count += 1
+
+    print(f"Processed {processed_count - error_count}/{processed_count} GraphML files")
+    return error_count